@@ -0,0 +1,414 @@
+"""Shared agent core: tools, caching and the LLM chat loop.
+
+Kept separate from the FastAPI wiring so every app entry point imports
+the same optimized implementation instead of carrying its own copy.
+"""
+
+import asyncio
+import json
+import os
+import re
+from types import SimpleNamespace
+import httpx
+import orjson
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Resolved once at import - web_search is a hot path and shouldn't
+# re-read the environment or rebuild the same header dict per call
+_API_KEY = os.getenv("SUPER_MIND_API_KEY")
+_SEARCH_URL = "https://space.ai-builders.com/backend/v1/search/"
+_SEARCH_HEADERS = {
+    "Authorization": f"Bearer {_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+# Collapses runs of whitespace in one pass inside the regex engine
+_WS_RE = re.compile(r'\s+')
+
+# Parser cost scales with input size, and the extracted text is capped at
+# 5000 chars anyway - no point downloading and parsing multi-MB pages
+_MAX_HTML_BYTES = 512 * 1024
+
+client = AsyncOpenAI(
+    api_key=_API_KEY,
+    base_url="https://space.ai-builders.com/backend/v1"
+)
+
+# Shared HTTP client with keep-alive pooling - reuses TCP+TLS connections
+# across tool calls instead of paying the handshake cost every time.
+# Async so tool I/O never blocks the uvicorn event loop.
+HTTP = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    headers={
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+)
+
+
+async def aclose():
+    """Release the shared HTTP client (call from the app's shutdown hook)."""
+    await HTTP.aclose()
+
+
+async def web_search(query: str) -> dict:
+    """Call the internal search API to search the web."""
+    try:
+        payload = {
+            "keywords": [query],
+            "max_results": 3
+        }
+
+        response = await HTTP.post(_SEARCH_URL, json=payload, headers=_SEARCH_HEADERS)
+        response.raise_for_status()
+        return response.json()
+
+    except httpx.TimeoutException:
+        print(f"[Error] Search request timed out for query: {query}")
+        return {"error": "Search request timed out", "query": query}
+    except httpx.HTTPStatusError as e:
+        print(f"[Error] HTTP error during search: {e}")
+        return {"error": f"HTTP error: {e.response.status_code}", "query": query}
+    except httpx.RequestError as e:
+        print(f"[Error] Request failed: {e}")
+        return {"error": f"Request failed: {str(e)}", "query": query}
+    except Exception as e:
+        print(f"[Error] Unexpected error in web_search: {e}")
+        return {"error": f"Unexpected error: {str(e)}", "query": query}
+
+
+async def read_page(url: str) -> dict:
+    """Fetch a webpage and extract the main text content."""
+    # Imported lazily so workers that never read pages don't pay the
+    # parser's import cost; Python caches the module after the first call
+    from selectolax.lexbor import LexborHTMLParser
+
+    try:
+        # Fetch the page, reading at most _MAX_HTML_BYTES of the body
+        # (User-Agent is set on the shared client)
+        truncated_input = False
+        raw = bytearray()
+        async with HTTP.stream("GET", url) as response:
+            # Raising on the status line alone means 4xx/5xx abort before
+            # downloading the body - error pages are often multi-MB templates
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                remaining = _MAX_HTML_BYTES - len(raw)
+                if len(chunk) >= remaining:
+                    raw += chunk[:remaining]
+                    truncated_input = True
+                    break
+                raw += chunk
+
+        # Parse HTML (Lexbor is a C parser, 10-40x faster than BS4 for this workload)
+        tree = LexborHTMLParser(bytes(raw))
+
+        # Remove script, style and navigation elements
+        for node in tree.css("script, style, nav, footer, header"):
+            node.decompose()
+
+        # Get cleaned text in one pass (separator + strip normalize whitespace)
+        body = tree.body
+        text = body.text(separator=' ', strip=True) if body else ''
+
+        # Collapse any doubled separators left by nested empty nodes
+        text = _WS_RE.sub(' ', text).strip()
+
+        # Limit text length to avoid token overflow
+        max_chars = 5000
+        if len(text) > max_chars:
+            text = text[:max_chars] + "... (truncated)"
+
+        return {
+            "url": url,
+            "text": text,
+            "length": len(text),
+            "truncated_input": truncated_input
+        }
+
+    except httpx.TimeoutException:
+        print(f"[Error] Page request timed out for URL: {url}")
+        return {"error": "Page request timed out", "url": url}
+    except httpx.HTTPStatusError as e:
+        print(f"[Error] HTTP error fetching page: {e}")
+        return {"error": f"HTTP error: {e.response.status_code}", "url": url}
+    except httpx.RequestError as e:
+        print(f"[Error] Request failed: {e}")
+        return {"error": f"Request failed: {str(e)}", "url": url}
+    except Exception as e:
+        print(f"[Error] Unexpected error in read_page: {e}")
+        return {"error": f"Unexpected error: {str(e)}", "url": url}
+
+
+# O(1) name -> coroutine dispatch; new tools register here and in the
+# `tools` schema below (final_answer is special-cased in the chat loop)
+TOOL_REGISTRY = {
+    "web_search": web_search,
+    "read_page": read_page,
+}
+
+
+# Tool schema for LLM function calling
+tools = [
+    {
+        "type": "function",
+        "function": {
+            "name": "web_search",
+            "description": "Search the web for current information. Use this when you need up-to-date information or facts about current events, people, places, or any topic you don't have information about.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "The search query string"
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_page",
+            "description": "Fetch and read the text content from a specific webpage URL. Use this when you need to read the detailed content of a page, such as documentation, articles, or changelogs. The function will extract the main text and remove scripts, styles, and navigation elements.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The full URL of the webpage to read (must start with http:// or https://)"
+                    }
+                },
+                "required": ["url"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "final_answer",
+            "description": "Finish the conversation by returning this exact text to the user. Call this when the tool results already contain everything needed, so no extra summarization round-trip is required.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "answer": {
+                        "type": "string",
+                        "description": "The complete final answer to show the user"
+                    }
+                },
+                "required": ["answer"]
+            }
+        }
+    }
+]
+
+
+# The model frequently re-issues identical searches/page reads across
+# turns, so recent tool results are cached for a short while
+TOOL_CACHE = TTLCache(maxsize=1024, ttl=600)
+_CACHE_LOCKS = {}
+
+
+async def execute_tool(tool_call) -> tuple:
+    """Parse arguments, route to the right tool and return (id, name, result)."""
+    print(f"\n[Agent] Decided to call tool: '{tool_call.function.name}'")
+    print(f"[Agent] Arguments: {tool_call.function.arguments}")
+
+    # Arguments come from the model as a canonical JSON string, so
+    # (name, arguments) identifies a tool invocation
+    key = (tool_call.function.name, tool_call.function.arguments)
+    if key in TOOL_CACHE:
+        print("[System] Tool cache hit")
+        return tool_call.id, tool_call.function.name, TOOL_CACHE[key]
+
+    # Per-key lock so concurrent identical calls run the tool only once
+    lock = _CACHE_LOCKS.setdefault(key, asyncio.Lock())
+    async with lock:
+        if key in TOOL_CACHE:
+            print("[System] Tool cache hit")
+            return tool_call.id, tool_call.function.name, TOOL_CACHE[key]
+
+        args = json.loads(tool_call.function.arguments)
+
+        # Route to the appropriate tool
+        handler = TOOL_REGISTRY.get(tool_call.function.name)
+        if handler is not None:
+            tool_result = await handler(**args)
+        else:
+            tool_result = {"error": f"Unknown tool: {tool_call.function.name}"}
+
+        # Don't cache failures - the next attempt may succeed
+        if "error" not in tool_result:
+            TOOL_CACHE[key] = tool_result
+
+    return tool_call.id, tool_call.function.name, tool_result
+
+
+# Tool results can be ~5KB each and every LLM call pays for the whole
+# history, so only the most recent ones are kept verbatim
+_KEEP_VERBATIM_TOOL_RESULTS = 4
+_COMPACT_CHARS = 200
+
+
+def compact_history(messages: list) -> None:
+    """Truncate all but the last few tool results to bound prompt size."""
+    kept = 0
+    for msg in reversed(messages):
+        if msg.get("role") != "tool":
+            continue
+        kept += 1
+        if kept <= _KEEP_VERBATIM_TOOL_RESULTS:
+            continue
+        if len(msg["content"]) > _COMPACT_CHARS:
+            msg["content"] = msg["content"][:_COMPACT_CHARS] + "... (older result compacted)"
+
+
+def _sse(payload: dict) -> str:
+    """Format one server-sent event."""
+    return f"data: {orjson.dumps(payload).decode()}\n\n"
+
+
+async def chat_stream(user_message: str):
+    """Run the tool-calling agent loop, yielding the final answer as SSE events.
+
+    Tool-call turns still buffer internally (the complete tool_calls are
+    needed before dispatch), but answer tokens are forwarded to the client
+    as soon as the model produces them, so time-to-first-byte is just the
+    model's time-to-first-token instead of the whole generation.
+    """
+    # Initialize conversation with user message
+    messages = [
+        {"role": "user", "content": user_message}
+    ]
+
+    max_turns = 10
+
+    for turn in range(max_turns):
+        print(f"\n{'='*60}")
+        print(f"[Turn {turn + 1}/{max_turns}]")
+        print(f"{'='*60}")
+
+        # Call LLM with streaming so answer tokens can be relayed live
+        stream = await client.chat.completions.create(
+            model="gpt-5",
+            messages=messages,
+            tools=tools,
+            stream=True
+        )
+
+        content_parts = []
+        pending_calls = {}
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.tool_calls:
+                # Tool-call arguments arrive in fragments keyed by index
+                for tc in delta.tool_calls:
+                    acc = pending_calls.setdefault(
+                        tc.index, {"id": "", "name": "", "arguments": ""}
+                    )
+                    if tc.id:
+                        acc["id"] = tc.id
+                    if tc.function:
+                        if tc.function.name:
+                            acc["name"] = tc.function.name
+                        if tc.function.arguments:
+                            acc["arguments"] += tc.function.arguments
+            elif delta.content:
+                content_parts.append(delta.content)
+                # Forward answer tokens immediately - tool-call turns
+                # normally carry no content, so this is the answer path
+                if not pending_calls:
+                    yield _sse({"delta": delta.content})
+
+        content = ''.join(content_parts)
+
+        # Check if LLM wants to call a tool
+        if pending_calls:
+            tool_calls = [
+                SimpleNamespace(
+                    id=acc["id"],
+                    function=SimpleNamespace(
+                        name=acc["name"],
+                        arguments=acc["arguments"]
+                    )
+                )
+                for _, acc in sorted(pending_calls.items())
+            ]
+
+            # If the model signals it's done, stream its answer directly
+            # instead of paying another LLM round-trip just to restate it
+            for tool_call in tool_calls:
+                if tool_call.function.name == "final_answer":
+                    answer = json.loads(tool_call.function.arguments).get("answer", "")
+                    print(f"\n[Agent] Final Answer (via final_answer tool): {answer}")
+                    print(f"{'='*60}\n")
+                    yield _sse({"delta": answer})
+                    yield "data: [DONE]\n\n"
+                    return
+
+            # Add assistant message with ALL tool calls first (CRITICAL: do this once, not per tool).
+            # Field order (id, type, function) is fixed so turn N's request
+            # stays a byte-exact prefix of turn N+1's, letting the server's
+            # automatic prefix cache hit instead of re-prefilling everything
+            messages.append({
+                "role": "assistant",
+                "content": content,
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "type": "function",
+                        "function": {
+                            "name": tc.function.name,
+                            "arguments": tc.function.arguments
+                        }
+                    } for tc in tool_calls
+                ]
+            })
+
+            # Then execute all tools concurrently - per-turn wall time drops
+            # from the sum of the tool latencies to the slowest one
+            results = await asyncio.gather(
+                *[execute_tool(tc) for tc in tool_calls],
+                return_exceptions=True
+            )
+
+            # Add tool results to history in the original call order
+            for tool_call, result in zip(tool_calls, results):
+                if isinstance(result, BaseException):
+                    tool_result = {"error": f"Tool execution failed: {result}"}
+                else:
+                    _, _, tool_result = result
+
+                print(f"[System] Tool Output: {orjson.dumps(tool_result, option=orjson.OPT_INDENT_2).decode()}")
+
+                # Sorted keys canonicalize the content string for the same
+                # prefix-stability reason as the assistant message above
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "name": tool_call.function.name,
+                    "content": orjson.dumps(tool_result, option=orjson.OPT_SORT_KEYS).decode()
+                })
+
+            # Compact older tool results so every remaining LLM call
+            # prompts with less dead weight
+            compact_history(messages)
+        else:
+            # No tool calls - the answer has already been streamed above
+            print(f"\n[Agent] Final Answer: {content}")
+            print(f"{'='*60}\n")
+            yield "data: [DONE]\n\n"
+            return
+
+    # If we've exhausted max_turns, tell the user
+    print(f"\n[System] Reached maximum turns ({max_turns})")
+    print(f"{'='*60}\n")
+    yield _sse({"delta": "I've reached the maximum number of tool calls. Please try rephrasing your question."})
+    yield "data: [DONE]\n\n"